@@ -1,85 +1,158 @@
-import streamlit as st
-import pandas as pd
-import requests
-import yfinance as yf
-import xml.etree.ElementTree as ET
+import importlib
+import logging
 import os
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+# Début de la partie du prologue qui dépend de l'application (streamlit exclu :
+# il est déjà importé par le serveur et ne se règle pas ici).
+_PROLOGUE_START = time.perf_counter()
+
+from cache_backend import backend_from_url, list_members, load_state, memoize, register_member, save_state
+from price_alerts import DIRECTIONS, METRICS, AlertBook, FiringState, send_email_alerts
+from quotes import Quote, QuoteBatch, format_change, format_price
 
 st.set_page_config(page_title="Noos: information | connaissance | action", layout="wide")
 
+logger = logging.getLogger("noos")
+
+# Budget (en ms) du prologue propre à app.py, au premier chargement dans un processus.
+IMPORT_BUDGET_MS = float(os.environ.get("NOOS_IMPORT_BUDGET_MS", "100"))
+
+#########################
+# 0. IMPORTS DIFFÉRÉS & DÉMARRAGE
+#########################
+class _LazyModule:
+    """Module importé seulement au premier accès à l'un de ses attributs."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pd = _LazyModule("pandas")
+requests = _LazyModule("requests")
+yf = _LazyModule("yfinance")
+ET = _LazyModule("xml.etree.ElementTree")
+px = _LazyModule("plotly.express")
+
+#########################
+# 0 bis. CACHE & ÉTAT PARTAGÉS
+#########################
+# Nombre maximal d'appels amont par minute, tous réplicas confondus (backend partagé).
+UPSTREAM_BUDGET = int(os.environ.get("NOOS_UPSTREAM_BUDGET", "120"))
+
+@st.cache_resource
+def get_cache_backend():
+    return backend_from_url(os.environ.get("NOOS_CACHE_BACKEND", "memory"))
+
+def cached(ttl=None):
+    """st.cache_data en mono-processus, cache partagé entre réplicas sinon."""
+    backend = get_cache_backend()
+    if not backend.shared:
+        return st.cache_data(ttl=ttl)
+    return memoize(backend, ttl=ttl or 86400, upstream_budget=UPSTREAM_BUDGET)
+
+def get_user_id():
+    """Identifiant stable de l'utilisateur, porté par le paramètre d'URL « u »."""
+    if "user_id" not in st.session_state:
+        user_id = st.query_params.get("u")
+        if not user_id:
+            user_id = uuid.uuid4().hex
+            st.query_params["u"] = user_id
+        st.session_state["user_id"] = user_id
+    return st.session_state["user_id"]
+
+def load_user_state(name, default):
+    backend = get_cache_backend()
+    if not backend.shared:
+        return default
+    return load_state(backend, get_user_id(), name, default)
+
+def save_user_state(name, value):
+    backend = get_cache_backend()
+    if backend.shared:
+        save_state(backend, get_user_id(), name, value)
+
 #########################
 # 1. FONCTIONS MARCHÉS
 #########################
-@st.cache_data(ttl=600)
+INDEX_TICKERS = {
+    "Dow Jones": "^DJI",
+    "Nasdaq": "^IXIC",
+    "S&P 500": "^GSPC"
+}
+
+CRYPTO_NAMES = {
+    "bitcoin": "Bitcoin",
+    "ethereum": "Ethereum",
+    "solana": "Solana",
+    "cardano": "Cardano",
+    "arbitrum": "Arbitrum",
+    "tron": "Tron"
+}
+
+BOND_NAMES = {
+    "US10Y": "US 10Y",
+    "DE10Y": "Bund 10Y",
+    "FR10Y": "OAT 10Y"
+}
+
+COMMODITY_NAMES = {
+    "GCUSD": ("Or", "USD/oz"),
+    "CLUSD": ("Pétrole WTI", "USD/baril"),
+    "HGUSD": ("Cuivre", "USD/lb"),
+}
+
+@cached(ttl=600)
 def get_market_index_prices():
-    tickers = {
-        "Dow Jones": "^DJI",
-        "Nasdaq": "^IXIC",
-        "S&P 500": "^GSPC"
-    }
-    data = []
-    for name, ticker in tickers.items():
+    batch = QuoteBatch()
+    for name, ticker in INDEX_TICKERS.items():
         ticker_obj = yf.Ticker(ticker)
         info = ticker_obj.info
         last = info.get("regularMarketPrice")
         change = info.get("regularMarketChangePercent")
         if last is not None and change is not None:
-            data.append({
-                "Nom": name,
-                "Ticker": ticker,
-                "Dernier": last,
-                "Variation": f"{change:+.2f}%"
-            })
-    return data
-
-@st.cache_data(ttl=600)
+            batch.append(Quote("bourse", ticker, name, last, change))
+    return batch
+
+@cached(ttl=600)
 def get_stock_price(symbol):
     try:
         ticker = yf.Ticker(symbol)
         info = ticker.info
-        last = info.get("regularMarketPrice")
-        name = info.get("shortName", symbol)
-        change = info.get("regularMarketChangePercent")
-        currency = info.get("currency", "")
-        return {
-            "Nom": name,
-            "Ticker": symbol.upper(),
-            "Dernier": last,
-            "Variation": f"{change:+.2f}%" if change is not None else "N/A",
-            "Devise": currency if currency else ""
-        }
+        return Quote(
+            "bourse",
+            symbol.upper(),
+            info.get("shortName", symbol),
+            info.get("regularMarketPrice"),
+            info.get("regularMarketChangePercent"),
+            unit=info.get("currency", ""),
+        )
     except Exception:
         return None
 
-@st.cache_data(ttl=300)
+@cached(ttl=300)
 def get_crypto_prices():
-    ids = "bitcoin,ethereum,solana,cardano,arbitrum,tron"
+    ids = ",".join(CRYPTO_NAMES)
     url = f"https://api.coingecko.com/api/v3/simple/price?ids={ids}&vs_currencies=usd&include_24hr_change=true"
     r = requests.get(url)
     r.raise_for_status()
     cg = r.json()
-    mapping = {
-        "bitcoin": "Bitcoin",
-        "ethereum": "Ethereum",
-        "solana": "Solana",
-        "cardano": "Cardano",
-        "arbitrum": "Arbitrum",
-        "tron": "Tron"
-    }
-    results = []
-    for cid, name in mapping.items():
+    batch = QuoteBatch()
+    for cid, name in CRYPTO_NAMES.items():
         if cid in cg:
-            price = cg[cid].get("usd")
-            change = cg[cid].get("usd_24h_change")
-            results.append({
-                "Nom": name,
-                "Ticker": cid,
-                "Dernier": price,
-                "Variation 24h": f"{change:+.2f}%" if change is not None else "N/A"
-            })
-    return results
-
-@st.cache_data(ttl=300)
+            batch.append(Quote("crypto", cid, name, cg[cid].get("usd"), cg[cid].get("usd_24h_change"), unit="USD"))
+    return batch
+
+@cached(ttl=300)
 def search_crypto_cg(query):
     url = "https://api.coingecko.com/api/v3/search"
     r = requests.get(url, params={"query": query})
@@ -88,8 +161,8 @@ def search_crypto_cg(query):
     data = r.json()
     return data.get("coins", [])
 
-@st.cache_data(ttl=600)
-def get_crypto_price_by_id(cg_id):
+@cached(ttl=600)
+def get_crypto_price_by_id(cg_id, name=None):
     url = f"https://api.coingecko.com/api/v3/simple/price?ids={cg_id}&vs_currencies=usd&include_24hr_change=true"
     r = requests.get(url)
     if r.status_code != 200:
@@ -97,15 +170,9 @@ def get_crypto_price_by_id(cg_id):
     data = r.json().get(cg_id)
     if not data:
         return None
-    price = data.get("usd")
-    change = data.get("usd_24h_change")
-    return {
-        "ID": cg_id,
-        "Dernier": price,
-        "Variation 24h": f"{change:+.2f}%" if change is not None else "N/A"
-    }
+    return Quote("crypto", cg_id, name or cg_id, data.get("usd"), data.get("usd_24h_change"), unit="USD")
 
-@st.cache_data(ttl=600)
+@cached(ttl=600)
 def get_bonds_prices(fmp_api_key=None):
     FMP_API_KEY = fmp_api_key or os.environ.get("FMP_API_KEY", "")
     endpoint = "https://financialmodelingprep.com/api/v3/quotes/bond"
@@ -114,31 +181,21 @@ def get_bonds_prices(fmp_api_key=None):
         r = requests.get(endpoint, params=params)
         r.raise_for_status()
         bonds = r.json()
-        mapping = {
-            "US10Y": "US 10Y",
-            "DE10Y": "Bund 10Y",
-            "FR10Y": "OAT 10Y"
-        }
-        results = []
+        batch = QuoteBatch()
         for bond in bonds:
             symbol = bond.get("symbol")
-            name = mapping.get(symbol)
+            name = BOND_NAMES.get(symbol)
             if name:
-                results.append({
-                    "Nom": name,
-                    "Ticker": symbol,
-                    "Dernier": bond.get("price"),
-                    "Variation": f"{bond.get('changesPercentage', 0):+0.2f}%"
-                })
-        return results
+                batch.append(Quote("bond", symbol, name, bond.get("price"), bond.get("changesPercentage", 0), unit="%"))
+        return batch
     except:
-        return [
-            {"Nom": "US 10Y", "Ticker": "US10Y", "Dernier": "4.25%", "Variation": "-0.03%"},
-            {"Nom": "Bund 10Y", "Ticker": "DE10Y", "Dernier": "2.37%", "Variation": "+0.01%"},
-            {"Nom": "OAT 10Y", "Ticker": "FR10Y", "Dernier": "3.12%", "Variation": "+0.00%"},
-        ]
+        return QuoteBatch([
+            Quote("bond", "US10Y", "US 10Y", 4.25, -0.03, unit="%"),
+            Quote("bond", "DE10Y", "Bund 10Y", 2.37, 0.01, unit="%"),
+            Quote("bond", "FR10Y", "OAT 10Y", 3.12, 0.00, unit="%"),
+        ])
 
-@st.cache_data(ttl=600)
+@cached(ttl=600)
 def get_commodities_prices(fmp_api_key=None):
     FMP_API_KEY = fmp_api_key or os.environ.get("FMP_API_KEY", "")
     endpoint = "https://financialmodelingprep.com/api/v3/quotes/commodity"
@@ -147,34 +204,45 @@ def get_commodities_prices(fmp_api_key=None):
         r = requests.get(endpoint, params=params)
         r.raise_for_status()
         commos = r.json()
-        mapping = {
-            "GCUSD": ("Or", "USD/oz"),
-            "CLUSD": ("Pétrole WTI", "USD/baril"),
-            "HGUSD": ("Cuivre", "USD/lb"),
-        }
-        results = []
+        batch = QuoteBatch()
         for c in commos:
             symbol = c.get("symbol")
-            if symbol in mapping:
-                nom, unite = mapping[symbol]
-                results.append({
-                    "Nom": nom,
-                    "Ticker": symbol,
-                    "Dernier": c.get("price"),
-                    "Unité": unite,
-                    "Variation": f"{c.get('changesPercentage', 0):+0.2f}%"
-                })
-        return results
+            if symbol in COMMODITY_NAMES:
+                nom, unite = COMMODITY_NAMES[symbol]
+                batch.append(Quote("commodity", symbol, nom, c.get("price"), c.get("changesPercentage", 0), unit=unite))
+        return batch
     except:
-        return [
-            {"Nom": "Or", "Ticker": "GCUSD", "Dernier": 2345.20, "Unité": "USD/oz", "Variation": "-0.3%"},
-            {"Nom": "Pétrole WTI", "Ticker": "CLUSD", "Dernier": 81.35, "Unité": "USD/baril", "Variation": "+0.8%"},
-            {"Nom": "Cuivre", "Ticker": "HGUSD", "Dernier": 4.38, "Unité": "USD/lb", "Variation": "+1.4%"},
-        ]
+        return QuoteBatch([
+            Quote("commodity", "GCUSD", "Or", 2345.20, -0.3, unit="USD/oz"),
+            Quote("commodity", "CLUSD", "Pétrole WTI", 81.35, 0.8, unit="USD/baril"),
+            Quote("commodity", "HGUSD", "Cuivre", 4.38, 1.4, unit="USD/lb"),
+        ])
+
+@st.cache_data
+def get_symbol_index():
+    """Index symbole -> (type, nom) des instruments suivis par défaut."""
+    index = {}
+    for name, ticker in INDEX_TICKERS.items():
+        index[ticker] = ("bourse", name)
+    for cid, name in CRYPTO_NAMES.items():
+        index[cid] = ("crypto", name)
+    for symbol, name in BOND_NAMES.items():
+        index[symbol] = ("bond", name)
+    for symbol, (name, _unit) in COMMODITY_NAMES.items():
+        index[symbol] = ("commodity", name)
+    return index
+
+def get_quote_snapshot():
+    """Instantané des cotations de tous les segments (servi par les caches)."""
+    snapshot = QuoteBatch()
+    for fetch in (get_market_index_prices, get_crypto_prices, get_bonds_prices, get_commodities_prices):
+        snapshot.extend(fetch())
+    return snapshot
 
 #########################
 # 2. FONCTIONS DONNÉES PUBLIQUES
 #########################
+@st.cache_data
 def load_data(source, country):
     filepath = f"data/{source}/{country}.json"
     if os.path.exists(filepath):
@@ -182,10 +250,25 @@ def load_data(source, country):
             return pd.read_json(f)
     return pd.DataFrame()
 
+def list_datasets():
+    """Couples (source, pays) disponibles sous data/."""
+    datasets = []
+    if not os.path.isdir("data"):
+        return datasets
+    for source in sorted(os.listdir("data")):
+        source_dir = os.path.join("data", source)
+        if not os.path.isdir(source_dir):
+            continue
+        for filename in sorted(os.listdir(source_dir)):
+            if filename.endswith(".json"):
+                datasets.append((source, filename[:-len(".json")]))
+    return datasets
+
 #########################
 # 3. FONCTIONS ÉTUDES (PubMed, EuropePMC, ClinicalTrials, JSTOR, etc.)
 #########################
 
+@cached(ttl=600)
 def search_pubmed(term, retmax=10, retstart=0):
     url = (
         "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
@@ -198,6 +281,7 @@ def search_pubmed(term, retmax=10, retstart=0):
     count = int(result.get("count", len(ids)))
     return ids, count
 
+@cached(ttl=600)
 def fetch_pubmed_details(idlist):
     if not idlist:
         return pd.DataFrame()
@@ -230,6 +314,7 @@ def fetch_pubmed_details(idlist):
         })
     return pd.DataFrame(articles)
 
+@cached(ttl=600)
 def search_europepmc(term, page=1, pageSize=10):
     url = "https://www.ebi.ac.uk/europepmc/webservices/rest/search"
     params = {
@@ -263,6 +348,7 @@ def search_europepmc(term, page=1, pageSize=10):
         })
     return pd.DataFrame(articles), total
 
+@cached(ttl=600)
 def search_clinicaltrials(term, max_studies=10):
     url = "https://clinicaltrials.gov/api/query/study_fields"
     params = {
@@ -293,6 +379,7 @@ def search_clinicaltrials(term, max_studies=10):
         })
     return pd.DataFrame(results)
 
+@cached(ttl=600)
 def search_rxivist(term, server="medrxiv", max_results=10):
     url = f"https://api.rxivist.org/v1/papers"
     params = {
@@ -338,17 +425,20 @@ def generic_db_search_link(term, base):
 #########################
 def init_portfolio():
     if "portfolio" not in st.session_state:
-        st.session_state["portfolio"] = {}
+        st.session_state["portfolio"] = load_user_state("portfolio", {})
 
-def add_to_portfolio(item):
+def add_to_portfolio(quote):
     init_portfolio()
-    st.session_state["portfolio"][item["type"] + ":" + item["id"]] = item
+    st.session_state["portfolio"][quote.kind + ":" + quote.symbol] = quote
+    save_user_state("portfolio", st.session_state["portfolio"])
 
 def remove_from_portfolio(item_type, item_id):
     init_portfolio()
     key = item_type + ":" + item_id
     if key in st.session_state["portfolio"]:
         del st.session_state["portfolio"][key]
+        save_user_state("portfolio", st.session_state["portfolio"])
+        remove_instrument_alerts(item_type, item_id)
 
 def get_portfolio_items():
     init_portfolio()
@@ -356,7 +446,7 @@ def get_portfolio_items():
 
 def init_study_alerts():
     if "study_alerts" not in st.session_state:
-        st.session_state["study_alerts"] = []
+        st.session_state["study_alerts"] = load_user_state("study_alerts", [])
 
 def add_study_alert(term, mode, email=None):
     init_study_alerts()
@@ -365,13 +455,194 @@ def add_study_alert(term, mode, email=None):
         "mode": mode,
         "email": email
     })
+    save_user_state("study_alerts", st.session_state["study_alerts"])
 
 def get_study_alerts():
     init_study_alerts()
     return st.session_state["study_alerts"]
 
+def refresh_quotes(items):
+    """Cotations à jour d'instruments (type, symbole, nom), en un seul lot.
+
+    Les instruments de l'index des symboles sont lus dans l'instantané commun ;
+    les autres (actions, cryptos recherchées) sont cotés un par un. Les instruments
+    sans cotation disponible sont absents du lot.
+    """
+    symbol_index = get_symbol_index()
+    snapshot = QuoteBatch()
+    if any(symbol_index.get(item.symbol, ("",))[0] == item.kind for item in items):
+        try:
+            snapshot = get_quote_snapshot()
+        except Exception:
+            logger.warning("Instantané des cotations indisponible", exc_info=True)
+    positions = {(kind, symbol): i for i, (kind, symbol) in enumerate(zip(snapshot.kind, snapshot.symbol))}
+    batch = QuoteBatch()
+    for item in items:
+        i = positions.get((item.kind, item.symbol))
+        if i is not None:
+            quote = snapshot[i]
+        elif symbol_index.get(item.symbol, ("",))[0] == item.kind:
+            quote = None
+        elif item.kind == "bourse":
+            quote = get_stock_price(item.symbol)
+        elif item.kind == "crypto":
+            quote = get_crypto_price_by_id(item.symbol, item.name)
+        else:
+            quote = None
+        if quote is not None and quote.has_price:
+            batch.append(quote)
+    return batch
+
+# Les alertes de prix sont lues et écrites directement dans le backend (jamais
+# gardées en session) : la boucle d'évaluation les modifie en arrière-plan.
+def _user_alert_book(user_id):
+    return load_state(get_cache_backend(), user_id, "price_alerts", AlertBook())
+
+def _save_user_alert_book(user_id, book):
+    # Seule l'interface écrit le carnet ; l'évaluation n'écrit que « price_alert_firing ».
+    backend = get_cache_backend()
+    save_state(backend, user_id, "price_alerts", book)
+    register_member(backend, "price_alerts", user_id)
+
+def add_price_alert(quote, metric, direction, threshold, mode, email=None):
+    user_id = get_user_id()
+    book = _user_alert_book(user_id)
+    alert = book.add(quote.kind, quote.symbol, quote.name, metric, direction, threshold, mode=mode, email=email)
+    _save_user_alert_book(user_id, book)
+    return alert
+
+def remove_price_alert(alert_id):
+    user_id = get_user_id()
+    book = _user_alert_book(user_id)
+    book.remove(alert_id)
+    _save_user_alert_book(user_id, book)
+
+def remove_instrument_alerts(kind, symbol):
+    user_id = get_user_id()
+    book = _user_alert_book(user_id)
+    book.remove_instrument(kind, symbol)
+    _save_user_alert_book(user_id, book)
+
+def get_price_alerts():
+    return list(_user_alert_book(get_user_id()).alerts.values())
+
+def get_price_notifications():
+    return load_state(get_cache_backend(), get_user_id(), "price_notifications", [])
+
+def evaluate_price_alerts():
+    """Évalue les alertes de tous les utilisateurs sur un même lot de cotations.
+
+    Les instruments surveillés sont cotés une seule fois ; chaque carnet, relu juste
+    avant le contrôle, ne lit ensuite dans son index trié que les seuils franchis.
+    Seul l'état de déclenchement est écrit, après la tentative d'envoi des e-mails.
+    """
+    backend = get_cache_backend()
+    user_ids = list_members(backend, "price_alerts")
+    instruments = {}
+    for user_id in user_ids:
+        for alert in _user_alert_book(user_id).alerts.values():
+            instruments[(alert.kind, alert.symbol)] = alert
+    if not instruments:
+        return []
+    batch = refresh_quotes(instruments.values())
+    all_fired, states, emails = [], {}, []
+    for user_id in user_ids:
+        # Relu après la cotation : les ajouts / suppressions faits entre-temps sont pris en compte.
+        book = _user_alert_book(user_id)
+        state = load_state(backend, user_id, "price_alert_firing", FiringState())
+        fired = book.check(batch, state)
+        dashboard = [(alert, value) for alert, value in fired if alert.mode == "Tableau de bord"]
+        if dashboard:
+            notifications = load_state(backend, user_id, "price_notifications", [])
+            for alert, value in dashboard:
+                notifications.insert(0, {"time": time.time(), "text": alert.describe(), "value": value})
+            save_state(backend, user_id, "price_notifications", notifications[:50])
+        # E-mails non remis au tick précédent, tant que l'alerte existe encore
+        state.undelivered = [(alert, value) for alert, value in state.undelivered if alert.alert_id in book.alerts]
+        state.undelivered += [(alert, value) for alert, value in fired if alert.mode == "Email"]
+        emails.extend(state.undelivered)
+        states[user_id] = state
+        all_fired.extend(fired)
+    try:
+        send_email_alerts(emails)
+    except OSError:
+        logger.warning("Envoi des alertes par e-mail impossible, nouvel essai au prochain tick", exc_info=True)
+    else:
+        for state in states.values():
+            state.undelivered = []
+    for user_id, state in states.items():
+        save_state(backend, user_id, "price_alert_firing", state)
+    return all_fired
+
+#########################
+# 6. PRÉCHAUFFAGE DES CACHES
+#########################
+def warm_up_caches():
+    """Remplit les caches (index des symboles, jeux de données, cotations) et purge le cache partagé."""
+    start = time.perf_counter()
+    get_symbol_index()
+    for source, country in list_datasets():
+        load_data(source, country)
+    get_cache_backend().purge()
+    try:
+        get_quote_snapshot()
+    except Exception:
+        logger.warning("Préchauffage des cotations impossible", exc_info=True)
+    logger.info("Caches préchauffés en %.0f ms", (time.perf_counter() - start) * 1000)
+
+@st.cache_resource
+def start_warm_up():
+    """Lance le préchauffage une seule fois par processus, en arrière-plan.
+
+    Streamlit n'exécute app.py qu'à l'ouverture d'une session : le préchauffage est
+    donc déclenché par la première session, dont le rendu se fait en parallèle. Les
+    sessions suivantes trouvent les caches remplis.
+    """
+    thread = threading.Thread(target=warm_up_caches, name="noos-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+if os.environ.get("NOOS_WARM_UP", "1") == "1":
+    start_warm_up()
+
+# Intervalle (en s) entre deux évaluations des alertes de prix.
+ALERT_INTERVAL = float(os.environ.get("NOOS_ALERT_INTERVAL", "60"))
+
+def alert_loop():
+    """Évalue les alertes toutes les ALERT_INTERVAL secondes, sur l'instantané des
+    cotations tel que rafraîchi par les caches, que l'utilisateur soit connecté ou non.
+
+    Avec un backend partagé, un seul réplica évalue par intervalle (verrou « alert_tick »).
+    """
+    while True:
+        try:
+            if get_cache_backend().add("alert_tick", b"1", ttl=ALERT_INTERVAL * 0.9):
+                evaluate_price_alerts()
+        except Exception:
+            logger.warning("Évaluation des alertes de prix impossible", exc_info=True)
+        time.sleep(ALERT_INTERVAL)
+
+@st.cache_resource
+def start_alert_loop():
+    thread = threading.Thread(target=alert_loop, name="noos-price-alerts", daemon=True)
+    thread.start()
+    return thread
+
+if os.environ.get("NOOS_ALERT_LOOP", "1") == "1":
+    start_alert_loop()
+
+@st.cache_resource
+def log_cold_start():
+    """Durée du prologue (après import streamlit) à la première exécution dans ce processus."""
+    cold_start_ms = (time.perf_counter() - _PROLOGUE_START) * 1000
+    if cold_start_ms > IMPORT_BUDGET_MS:
+        logger.warning("Premier chargement de app.py : %.0f ms (budget %.0f ms)", cold_start_ms, IMPORT_BUDGET_MS)
+    return cold_start_ms
+
+log_cold_start()
+
 #########################
-# 6. INTERFACE UTILISATEUR
+# 7. INTERFACE UTILISATEUR
 #########################
 
 st.title("Noos: information | connaissance | action")
@@ -384,24 +655,64 @@ st.markdown("---")
 if main_choice == "Tableau de bord":
     st.header("📊 Votre tableau de bord personnalisé")
     portfolio_items = get_portfolio_items()
+    if portfolio_items:
+        fresh = {(q.kind, q.symbol): q for q in refresh_quotes(portfolio_items)}
+        portfolio_items = [fresh.get((item.kind, item.symbol), item) for item in portfolio_items]
     if not portfolio_items:
         st.info("Ajoutez des éléments de marché, cryptos, bonds ou commodities via l'onglet 'Marchés' ou 'Blockchains' pour composer votre tableau de bord ici !")
     else:
         for idx, item in enumerate(portfolio_items):
             cols = st.columns([3, 2, 2, 1, 1])
             with cols[0]:
-                st.markdown(f"**{item['Nom']}**" + (f" ({item.get('Ticker', '')})" if item.get("Ticker") else ""))
+                st.markdown(f"**{item.name}**" + (f" ({item.symbol})" if item.symbol else ""))
             with cols[1]:
-                st.markdown(f"{item.get('Dernier', 'N/A')} {item.get('Devise', item.get('Unité',''))}")
+                st.markdown(f"{format_price(item.last)} {item.unit}")
             with cols[2]:
-                st.markdown(item.get("Variation", item.get("Variation 24h", "")))
+                st.markdown(format_change(item.change_pct))
             with cols[3]:
-                st.markdown(item.get("type", ""))
+                st.markdown(item.kind)
             with cols[4]:
-                if st.button("❌ Supprimer", key=f"remove_{item['type']}_{item['id']}"):
-                    remove_from_portfolio(item['type'], item['id'])
-                    st.experimental_rerun()
-        st.caption("Ce tableau de bord est temporaire (lié à votre session).")
+                if st.button("❌ Supprimer", key=f"remove_{item.kind}_{item.symbol}"):
+                    remove_from_portfolio(item.kind, item.symbol)
+                    st.rerun()
+        if get_cache_backend().shared:
+            st.caption("Ce tableau de bord est conservé : gardez l'adresse de cette page (paramètre « u ») pour le retrouver.")
+        else:
+            st.caption("Ce tableau de bord est temporaire (lié à votre session).")
+
+    st.markdown("## 🔔 Alertes de prix")
+    if portfolio_items:
+        with st.form("create_price_alert"):
+            labels = [f"{item.name} ({item.symbol})" for item in portfolio_items]
+            alert_item = st.selectbox("Instrument", range(len(portfolio_items)), format_func=labels.__getitem__)
+            alert_metric = st.selectbox("Mesure", list(METRICS), format_func=METRICS.get)
+            alert_direction = st.selectbox("Condition", list(DIRECTIONS), format_func=DIRECTIONS.get)
+            alert_threshold = st.number_input("Seuil", value=0.0, format="%.4f")
+            price_alert_mode = st.selectbox("Recevoir l'alerte", ["Tableau de bord", "Email"], key="price_alert_mode")
+            price_alert_email = st.text_input("Email (si alerte par Email)", value="", key="price_alert_email")
+            if st.form_submit_button("Créer l'alerte de prix"):
+                if price_alert_mode == "Email" and not price_alert_email:
+                    st.warning("Veuillez saisir votre email pour recevoir l'alerte.")
+                else:
+                    alert = add_price_alert(
+                        portfolio_items[alert_item], alert_metric, alert_direction, alert_threshold,
+                        mode=price_alert_mode, email=price_alert_email if price_alert_mode == "Email" else None,
+                    )
+                    st.success(f"Alerte créée : {alert.describe()}")
+    price_alerts = get_price_alerts()
+    if not price_alerts:
+        st.info("Aucune alerte de prix n'est active.")
+    for alert in price_alerts:
+        cols = st.columns([6, 1])
+        with cols[0]:
+            st.markdown(f"{alert.describe()} &nbsp; | &nbsp; **Alerte par** : {alert.mode}" + (f" ({alert.email})" if alert.mode == "Email" else ""))
+        with cols[1]:
+            if st.button("❌", key=f"remove_price_alert_{alert.alert_id}"):
+                remove_price_alert(alert.alert_id)
+                st.rerun()
+    for notification in get_price_notifications()[:10]:
+        st.warning(f"{time.strftime('%d/%m %H:%M', time.localtime(notification['time']))} — {notification['text']} (valeur : {notification['value']:g})")
+
     study_alerts = get_study_alerts()
     st.markdown("## 🔔 Alertes études (bases médicales)")
     if not study_alerts:
@@ -447,11 +758,9 @@ elif main_choice == "Données publiques":
         st.dataframe(filtered_data1)
         chart_type = st.selectbox("Type de visualisation", ["Barres", "Lignes", "Données textuelles"], key="chart1")
         if chart_type == "Barres":
-            import plotly.express as px
             fig = px.bar(filtered_data1, x="indicateur", y="valeur", color="indicateur", title=f"Indicateurs en {selected_year}")
             st.plotly_chart(fig, use_container_width=True)
         elif chart_type == "Lignes":
-            import plotly.express as px
             fig = px.line(filtered_data1, x="indicateur", y="valeur", color="indicateur", title=f"Indicateurs en {selected_year}")
             st.plotly_chart(fig, use_container_width=True)
         else:
@@ -467,11 +776,9 @@ elif main_choice == "Données publiques":
         st.dataframe(filtered_data2)
         chart_type2 = st.selectbox("Type de visualisation (comparaison)", ["Barres", "Lignes", "Données textuelles"], key="chart2")
         if chart_type2 == "Barres":
-            import plotly.express as px
             fig2 = px.bar(filtered_data2, x="indicateur", y="valeur", color="indicateur", title=f"Indicateurs en {selected_year2}")
             st.plotly_chart(fig2, use_container_width=True)
         elif chart_type2 == "Lignes":
-            import plotly.express as px
             fig2 = px.line(filtered_data2, x="indicateur", y="valeur", color="indicateur", title=f"Indicateurs en {selected_year2}")
             st.plotly_chart(fig2, use_container_width=True)
         else:
@@ -591,31 +898,21 @@ elif main_choice == "Marchés":
     if selected_market == "Bourses":
         st.markdown("#### Indices Boursiers (temps réel)")
         indices = get_market_index_prices()
-        df = pd.DataFrame(indices)
-        st.table(df)
+        st.table(indices.to_frame())
         st.markdown("#### Ajouter un indice à votre tableau de bord")
-        selected_idx = st.selectbox("Sélectionnez un indice à ajouter :", [x['Nom'] for x in indices])
+        selected_idx = st.selectbox("Sélectionnez un indice à ajouter :", indices.name)
         if st.button("Ajouter l'indice au tableau de bord"):
-            idx_item = next(x for x in indices if x['Nom'] == selected_idx)
-            add_to_portfolio({
-                "type": "bourse",
-                "id": idx_item["Ticker"],
-                **idx_item
-            })
+            add_to_portfolio(indices.find(name=selected_idx))
             st.success(f"{selected_idx} ajouté à votre tableau de bord !")
         st.markdown("#### Recherche d'une action (par nom ou ticker)")
         stock_query = st.text_input("Entrez le nom ou ticker de l'action (ex: AAPL, Apple...)", key="stock_search")
         if stock_query.strip():
             stock_data = get_stock_price(stock_query.strip())
-            if stock_data and stock_data["Dernier"] is not None:
-                st.success(f"{stock_data['Nom']} ({stock_data['Ticker']}) : {stock_data['Dernier']} {stock_data['Devise']} ({stock_data['Variation']})")
+            if stock_data and stock_data.has_price:
+                st.success(f"{stock_data.name} ({stock_data.symbol}) : {format_price(stock_data.last)} {stock_data.unit} ({format_change(stock_data.change_pct)})")
                 if st.button("Ajouter cette action au tableau de bord", key="add_stock_btn"):
-                    add_to_portfolio({
-                        "type": "bourse",
-                        "id": stock_data["Ticker"],
-                        **stock_data
-                    })
-                    st.success(f"{stock_data['Nom']} ajouté au tableau de bord !")
+                    add_to_portfolio(stock_data)
+                    st.success(f"{stock_data.name} ajouté au tableau de bord !")
             else:
                 url = f"https://query2.finance.yahoo.com/v1/finance/search"
                 r = requests.get(url, params={"q": stock_query, "quotes_count": 5})
@@ -632,17 +929,11 @@ elif main_choice == "Marchés":
     elif selected_market == "Cryptos":
         st.markdown("#### Cryptomonnaies principales (temps réel)")
         cryptos = get_crypto_prices()
-        df = pd.DataFrame(cryptos)
-        st.table(df)
+        st.table(cryptos.to_frame(change_label="Variation 24h"))
         st.markdown("#### Ajouter une crypto à votre tableau de bord")
-        selected_crypto = st.selectbox("Sélectionnez une crypto à ajouter :", [x['Nom'] for x in cryptos])
+        selected_crypto = st.selectbox("Sélectionnez une crypto à ajouter :", cryptos.name)
         if st.button("Ajouter la crypto au tableau de bord"):
-            c = next(x for x in cryptos if x['Nom'] == selected_crypto)
-            add_to_portfolio({
-                "type": "crypto",
-                "id": c['Ticker'],
-                **c
-            })
+            add_to_portfolio(cryptos.find(name=selected_crypto))
             st.success(f"{selected_crypto} ajouté au tableau de bord !")
         st.markdown("#### Recherche d'une cryptomonnaie (par nom ou ticker)")
         crypto_query = st.text_input("Entrez le nom ou le ticker de la crypto (ex: BTC, bitcoin...)", key="crypto_search")
@@ -650,18 +941,11 @@ elif main_choice == "Marchés":
             results = search_crypto_cg(crypto_query.strip())
             if results:
                 for coin in results[:3]:
-                    price_data = get_crypto_price_by_id(coin["id"])
+                    price_data = get_crypto_price_by_id(coin["id"], coin["name"])
                     if price_data:
-                        st.success(f"{coin['name']} ({coin['symbol'].upper()}): {price_data['Dernier']} $ ({price_data['Variation 24h']})")
+                        st.success(f"{coin['name']} ({coin['symbol'].upper()}): {format_price(price_data.last)} $ ({format_change(price_data.change_pct)})")
                         if st.button(f"Ajouter {coin['name']} au tableau de bord", key=f"add_crypto_{coin['id']}"):
-                            add_to_portfolio({
-                                "type": "crypto",
-                                "id": coin['id'],
-                                "Nom": coin['name'],
-                                "Ticker": coin['symbol'].upper(),
-                                "Dernier": price_data["Dernier"],
-                                "Variation 24h": price_data["Variation 24h"]
-                            })
+                            add_to_portfolio(price_data)
                             st.success(f"{coin['name']} ajouté au tableau de bord !")
                         st.caption(f"[Voir sur CoinGecko](https://www.coingecko.com/fr/pièces/{coin['id']})")
             else:
@@ -670,33 +954,21 @@ elif main_choice == "Marchés":
     elif selected_market == "Bonds":
         st.markdown("#### Obligations principales (temps réel)")
         bonds = get_bonds_prices()
-        df = pd.DataFrame(bonds)
-        st.table(df)
+        st.table(bonds.to_frame())
         st.markdown("#### Ajouter une obligation à votre tableau de bord")
-        selected_bond = st.selectbox("Sélectionnez une obligation à ajouter :", [x['Nom'] for x in bonds])
+        selected_bond = st.selectbox("Sélectionnez une obligation à ajouter :", bonds.name)
         if st.button("Ajouter l'obligation au tableau de bord"):
-            b = next(x for x in bonds if x['Nom'] == selected_bond)
-            add_to_portfolio({
-                "type": "bond",
-                "id": b["Ticker"],
-                **b
-            })
+            add_to_portfolio(bonds.find(name=selected_bond))
             st.success(f"{selected_bond} ajoutée au tableau de bord !")
 
     elif selected_market == "Commodities":
         st.markdown("#### Matières premières (temps réel)")
         commos = get_commodities_prices()
-        df = pd.DataFrame(commos)
-        st.table(df)
+        st.table(commos.to_frame())
         st.markdown("#### Ajouter une matière première à votre tableau de bord")
-        selected_com = st.selectbox("Sélectionnez une matière première à ajouter :", [x['Nom'] for x in commos])
+        selected_com = st.selectbox("Sélectionnez une matière première à ajouter :", commos.name)
         if st.button("Ajouter la matière première au tableau de bord"):
-            c = next(x for x in commos if x['Nom'] == selected_com)
-            add_to_portfolio({
-                "type": "commodity",
-                "id": c["Ticker"],
-                **c
-            })
+            add_to_portfolio(commos.find(name=selected_com))
             st.success(f"{selected_com} ajoutée au tableau de bord !")
 
 elif main_choice == "Blockchains":
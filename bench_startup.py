@@ -0,0 +1,61 @@
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules lourds dont l'import est désormais différé dans app.py
+HEAVY_MODULES = ["pandas", "requests", "yfinance", "xml.etree.ElementTree", "plotly.express"]
+
+# Début de l'interface dans app.py : tout ce qui précède constitue le prologue
+PROLOGUE_END = 'st.title("Noos'
+
+def _run_ms(code, cwd=None):
+    """Exécute code dans un interpréteur neuf ; code affiche une durée en ms."""
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=cwd)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def _median_ms(code, cwd=None, repeat=5):
+    return statistics.median(_run_ms(code, cwd) for _ in range(repeat))
+
+# 1. Temps d'import d'un module dans un interpréteur neuf (en ms)
+def measure_import(module, repeat=5):
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    return _median_ms(code, repeat=repeat)
+
+# 2. Temps du prologue de app.py (imports, définitions, démarrage), sans l'interface
+def measure_prologue(path="app.py", repeat=5):
+    path = os.path.abspath(path)
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {os.path.dirname(path)!r})\n"
+        f"src = open({path!r}, encoding='utf-8').read()\n"
+        f"prologue = compile(src[:src.index({PROLOGUE_END!r})], {path!r}, 'exec')\n"
+        "t = time.perf_counter()\n"
+        "exec(prologue, {'__name__': '__main__'})\n"
+        "print((time.perf_counter() - t) * 1000)\n"
+    )
+    return _median_ms(code, cwd=os.path.dirname(path), repeat=repeat)
+
+# 3. Temps du premier rendu de app.py (exécution complète du script, en ms)
+def measure_first_render(path="app.py", repeat=5, timeout=60):
+    path = os.path.abspath(path)
+    code = (
+        "import time\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "t = time.perf_counter()\n"
+        f"AppTest.from_file({path!r}, default_timeout={timeout}).run()\n"
+        "print((time.perf_counter() - t) * 1000)\n"
+    )
+    return _median_ms(code, cwd=os.path.dirname(path), repeat=repeat)
+
+if __name__ == "__main__":
+    # python bench_startup.py [chemin/vers/app.py] : comparer deux révisions (git worktree)
+    app_path = sys.argv[1] if len(sys.argv) > 1 else "app.py"
+    for module in HEAVY_MODULES + ["streamlit"]:
+        print(f"import {module:<25} {measure_import(module):8.1f} ms")
+    print(f"prologue {app_path:<23} {measure_prologue(app_path):8.1f} ms")
+    print(f"premier rendu {app_path:<18} {measure_first_render(app_path):8.1f} ms")
@@ -0,0 +1,319 @@
+"""Backends de cache et d'état partagés entre plusieurs réplicas Streamlit.
+
+Le backend est choisi par la variable d'environnement NOOS_CACHE_BACKEND :
+
+- ``memory`` (défaut) : dictionnaire propre au processus ;
+- ``sqlite:///chemin/noos.db`` : fichier SQLite partagé par les réplicas d'un même
+  hôte ou volume (``sqlite:////dev/shm/noos.db`` le place en mémoire partagée) ;
+- ``redis://hôte:port/0`` : serveur Redis (ou compatible : KeyDB, Valkey...).
+
+Tous les backends exposent la même interface : get / set / add / incr / delete /
+purge, avec des valeurs en octets et une durée de vie optionnelle en secondes.
+"""
+import functools
+import hashlib
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+#########################
+# 1. BACKENDS
+#########################
+class MemoryBackend:
+    """Stockage en mémoire du processus (un seul réplica)."""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._alive(key, time.time())
+            return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            now = time.time()
+            if self._alive(key, now):
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def incr(self, key, ttl=None):
+        with self._lock:
+            now = time.time()
+            entry = self._alive(key, now)
+            if entry:
+                count, expires_at = int(entry[0]) + 1, entry[1]
+            else:
+                count, expires_at = 1, now + ttl if ttl else None
+            self._data[key] = (count, expires_at)
+            return count
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def purge(self):
+        """Supprime les entrées expirées ; renvoie leur nombre."""
+        with self._lock:
+            now = time.time()
+            expired = [k for k, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+
+class SQLiteBackend:
+    """Stockage dans un fichier SQLite partagé entre processus.
+
+    Les lignes expirées ne sont lues par personne mais occupent le fichier : une
+    écriture sur ``purge_every`` (en moyenne) les supprime toutes.
+    """
+
+    shared = True
+    purge_every = 100
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+        if random.randrange(self.purge_every) == 0:
+            self.purge()
+
+    def add(self, key, value, ttl=None):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, now))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def incr(self, key, ttl=None):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, now))
+            conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (key, now + ttl if ttl else None),
+            )
+            count = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return int(count)
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def purge(self):
+        cur = self._connect().execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+        return cur.rowcount
+
+
+class RedisBackend:
+    """Stockage dans Redis via un client compatible redis-py.
+
+    N'importe quel objet offrant get / set(ex=, nx=) / incr / expire / delete
+    convient, ce qui permet d'utiliser un substitut local (fakeredis, par exemple).
+    """
+
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, ex=int(ttl) if ttl else None, nx=True))
+
+    def incr(self, key, ttl=None):
+        count = self.client.incr(key)
+        if count == 1 and ttl:
+            self.client.expire(key, int(ttl))
+        return int(count)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def purge(self):
+        # Redis supprime lui-même les clés expirées.
+        return 0
+
+
+def backend_from_url(url):
+    """Construit le backend décrit par une URL NOOS_CACHE_BACKEND."""
+    if not url or url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Backend de cache inconnu : {url}")
+
+#########################
+# 2. MÉMOÏSATION PARTAGÉE
+#########################
+def _cache_key(func, args, kwargs):
+    digest = hashlib.sha256(pickle.dumps((args, sorted(kwargs.items())))).hexdigest()
+    return f"cache:{func.__module__}.{func.__qualname__}:{digest}"
+
+
+def memoize(backend, ttl, stale_ttl=None, lock_timeout=30, upstream_budget=None):
+    """Décorateur de mise en cache partagée entre réplicas.
+
+    - une seule requête amont par clé et par période ``ttl`` : le réplica qui
+      obtient le verrou appelle la fonction, les autres attendent son résultat ;
+    - ``upstream_budget`` limite le nombre total d'appels amont par minute, tous
+      réplicas confondus ; au-delà, la dernière valeur connue est servie. Une clé
+      jamais calculée (ou dont la valeur a disparu) n'a rien à servir : elle est
+      calculée même hors budget, et cet appel est compté ;
+    - les valeurs restent disponibles ``stale_ttl`` secondes après expiration
+      (par défaut : ``ttl``) pour ces deux cas de repli.
+    """
+    stale_ttl = ttl if stale_ttl is None else stale_ttl
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(func, args, kwargs)
+            stale = None
+            raw = backend.get(key)
+            if raw is not None:
+                fetched_at, value = pickle.loads(raw)
+                if time.time() - fetched_at < ttl:
+                    return value
+                stale = (value,)
+
+            lock_key = key + ":lock"
+            owns_lock = backend.add(lock_key, b"1", ttl=lock_timeout)
+            if not owns_lock:
+                if stale:
+                    return stale[0]
+                deadline = time.time() + lock_timeout
+                while time.time() < deadline:
+                    time.sleep(0.1)
+                    raw = backend.get(key)
+                    if raw is not None:
+                        return pickle.loads(raw)[1]
+                # Le détenteur du verrou n'a pas abouti : on appelle nous-mêmes.
+
+            try:
+                if upstream_budget is not None:
+                    window = int(time.time() // 60)
+                    over_budget = backend.incr(f"budget:{window}", ttl=120) > upstream_budget
+                    if over_budget and stale:
+                        return stale[0]
+                value = func(*args, **kwargs)
+                backend.set(key, pickle.dumps((time.time(), value)), ttl=ttl + stale_ttl)
+                return value
+            finally:
+                if owns_lock:
+                    backend.delete(lock_key)
+
+        return wrapper
+
+    return decorator
+
+#########################
+# 3. ÉTAT UTILISATEUR
+#########################
+def load_state(backend, user_id, name, default):
+    raw = backend.get(f"state:{user_id}:{name}")
+    return pickle.loads(raw) if raw is not None else default
+
+
+def save_state(backend, user_id, name, value):
+    backend.set(f"state:{user_id}:{name}", pickle.dumps(value))
+
+
+def register_member(backend, registry, member):
+    """Inscrit ``member`` dans un registre partagé, une clé par membre.
+
+    Sans lecture-modification-écriture : le marqueur est posé par ``add`` (atomique),
+    puis le membre reçoit un rang par ``incr``. Deux réplicas ne peuvent ni perdre
+    ni dupliquer une inscription.
+    """
+    if not backend.add(f"registry:{registry}:member:{member}", b"1"):
+        return False
+    rank = backend.incr(f"registry:{registry}:count")
+    backend.set(f"registry:{registry}:{rank}", str(member).encode())
+    return True
+
+
+def list_members(backend, registry):
+    raw = backend.get(f"registry:{registry}:count")
+    members = []
+    for rank in range(1, int(raw) + 1 if raw is not None else 1):
+        member = backend.get(f"registry:{registry}:{rank}")
+        # Rang réservé mais pas encore écrit : inscription en cours sur un autre réplica
+        if member is not None:
+            members.append(member.decode() if isinstance(member, bytes) else member)
+    return members
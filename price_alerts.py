@@ -0,0 +1,202 @@
+"""Alertes de prix et de variation sur les instruments du tableau de bord.
+
+Les seuils sont rangés, pour chaque (type, symbole, mesure, sens), dans une liste
+triée : à chaque nouvel instantané de cotations, les alertes déclenchées se lisent
+par recherche dichotomique (O(log n + k)) au lieu de tester chaque alerte.
+
+Une alerte ne se déclenche qu'au franchissement du seuil (pas tant que la condition
+reste vraie), puis reste muette pendant son délai de réarmement (cooldown).
+
+Le carnet (``AlertBook``, les alertes de l'utilisateur) et l'état de déclenchement
+(``FiringState``) sont séparés : l'interface n'écrit que le premier, l'évaluation
+périodique que le second, si bien qu'aucun des deux n'écrase les modifications de l'autre.
+"""
+import math
+import os
+import smtplib
+import time
+from bisect import bisect_left, bisect_right
+from email.message import EmailMessage
+
+METRICS = {"last": "Prix", "change_pct": "Variation (%)"}
+DIRECTIONS = {"above": "au-dessus de", "below": "en dessous de"}
+
+DEFAULT_COOLDOWN = 15 * 60
+
+#########################
+# 1. ALERTE
+#########################
+class PriceAlert:
+    __slots__ = ("alert_id", "kind", "symbol", "name", "metric", "direction",
+                 "threshold", "mode", "email", "cooldown")
+
+    def __init__(self, alert_id, kind, symbol, name, metric, direction, threshold,
+                 mode="Tableau de bord", email=None, cooldown=DEFAULT_COOLDOWN):
+        if metric not in METRICS:
+            raise ValueError(f"Mesure inconnue : {metric}")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Sens inconnu : {direction}")
+        self.alert_id = alert_id
+        self.kind = kind
+        self.symbol = symbol
+        self.name = name
+        self.metric = metric
+        self.direction = direction
+        self.threshold = float(threshold)
+        self.mode = mode
+        self.email = email
+        self.cooldown = cooldown
+
+    def describe(self):
+        unit = "%" if self.metric == "change_pct" else ""
+        return f"{self.name} : {METRICS[self.metric]} {DIRECTIONS[self.direction]} {self.threshold:g}{unit}"
+
+#########################
+# 2. INDEX DES SEUILS
+#########################
+class ThresholdIndex:
+    """Seuils triés par (type, symbole, mesure, sens)."""
+
+    def __init__(self):
+        # clé -> (seuils triés, identifiants d'alerte dans le même ordre)
+        self._slots = {}
+        self._instruments = {}
+
+    def add(self, alert):
+        key = (alert.kind, alert.symbol, alert.metric, alert.direction)
+        thresholds, ids = self._slots.setdefault(key, ([], []))
+        pos = bisect_right(thresholds, alert.threshold)
+        thresholds.insert(pos, alert.threshold)
+        ids.insert(pos, alert.alert_id)
+        self._instruments[(alert.kind, alert.symbol)] = self._instruments.get((alert.kind, alert.symbol), 0) + 1
+
+    def remove(self, alert):
+        key = (alert.kind, alert.symbol, alert.metric, alert.direction)
+        thresholds, ids = self._slots[key]
+        pos = ids.index(alert.alert_id)
+        del thresholds[pos], ids[pos]
+        if not ids:
+            del self._slots[key]
+        instrument = (alert.kind, alert.symbol)
+        self._instruments[instrument] -= 1
+        if not self._instruments[instrument]:
+            del self._instruments[instrument]
+
+    def matches(self, kind, symbol, metric, value):
+        """Identifiants des alertes dont la condition est vraie pour cette valeur."""
+        if math.isnan(value):
+            return []
+        matched = []
+        above = self._slots.get((kind, symbol, metric, "above"))
+        if above:
+            matched.extend(above[1][:bisect_right(above[0], value)])
+        below = self._slots.get((kind, symbol, metric, "below"))
+        if below:
+            matched.extend(below[1][bisect_left(below[0], value):])
+        return matched
+
+    def evaluate(self, batch):
+        """{identifiant d'alerte: valeur observée} pour un QuoteBatch complet."""
+        matched = {}
+        for i in range(len(batch)):
+            if (batch.kind[i], batch.symbol[i]) not in self._instruments:
+                continue
+            for metric in METRICS:
+                value = getattr(batch, metric)[i]
+                for alert_id in self.matches(batch.kind[i], batch.symbol[i], metric, value):
+                    matched[alert_id] = value
+        return matched
+
+#########################
+# 3. CARNET D'ALERTES (dé-duplication & réarmement)
+#########################
+class FiringState:
+    """État de déclenchement d'un carnet : alertes actives, derniers envois, e-mails en attente."""
+
+    def __init__(self):
+        self.active = set()
+        self.last_fired = {}
+        # (alerte, valeur) dont l'e-mail n'a pas pu partir : renvoyés au tick suivant
+        self.undelivered = []
+
+
+class AlertBook:
+    def __init__(self):
+        self.alerts = {}
+        self.index = ThresholdIndex()
+        self._next_id = 1
+
+    def add(self, kind, symbol, name, metric, direction, threshold, **options):
+        alert = PriceAlert(self._next_id, kind, symbol, name, metric, direction, threshold, **options)
+        self._next_id += 1
+        self.alerts[alert.alert_id] = alert
+        self.index.add(alert)
+        return alert
+
+    def remove(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is not None:
+            self.index.remove(alert)
+
+    def remove_instrument(self, kind, symbol):
+        for alert in list(self.alerts.values()):
+            if alert.kind == kind and alert.symbol == symbol:
+                self.remove(alert.alert_id)
+
+    def check(self, batch, state, now=None):
+        """Alertes à notifier pour ce lot : liste de (alerte, valeur observée).
+
+        ``state`` (FiringState) est mis à jour sur place.
+        """
+        now = time.time() if now is None else now
+        matched = self.index.evaluate(batch)
+        fired = []
+        for alert_id, value in matched.items():
+            if alert_id in state.active:
+                continue
+            alert = self.alerts[alert_id]
+            if now - state.last_fired.get(alert_id, -math.inf) < alert.cooldown:
+                continue
+            state.last_fired[alert_id] = now
+            fired.append((alert, value))
+        # Seules les alertes observées dans ce lot et dont la condition est fausse sont
+        # réarmées : une cotation absente ou manquante (NaN) ne vaut pas franchissement.
+        positions = {(kind, symbol): i for i, (kind, symbol) in enumerate(zip(batch.kind, batch.symbol))}
+        still_active = set()
+        for alert_id in state.active:
+            alert = self.alerts.get(alert_id)
+            if alert is None:
+                continue
+            i = positions.get((alert.kind, alert.symbol))
+            if i is None or math.isnan(getattr(batch, alert.metric)[i]):
+                still_active.add(alert_id)
+        state.active = still_active | set(matched)
+        state.last_fired = {k: v for k, v in state.last_fired.items() if k in self.alerts}
+        return fired
+
+#########################
+# 4. ENVOI PAR E-MAIL
+#########################
+def send_email_alerts(fired, host=None, port=None, sender=None):
+    """Un e-mail par destinataire, via le serveur SMTP configuré.
+
+    En local, un serveur de test suffit : ``python -m aiosmtpd -n -l localhost:1025``.
+    """
+    host = host or os.environ.get("NOOS_SMTP_HOST", "localhost")
+    port = int(port or os.environ.get("NOOS_SMTP_PORT", "1025"))
+    sender = sender or os.environ.get("NOOS_SMTP_SENDER", "alertes@noos.local")
+    by_recipient = {}
+    for alert, value in fired:
+        if alert.mode == "Email" and alert.email:
+            by_recipient.setdefault(alert.email, []).append(f"- {alert.describe()} (valeur : {value:g})")
+    if not by_recipient:
+        return 0
+    with smtplib.SMTP(host, port, timeout=10) as smtp:
+        for recipient, lines in by_recipient.items():
+            msg = EmailMessage()
+            msg["Subject"] = f"Noos : {len(lines)} alerte(s) de prix"
+            msg["From"] = sender
+            msg["To"] = recipient
+            msg.set_content("\n".join(lines))
+            smtp.send_message(msg)
+    return len(by_recipient)
@@ -0,0 +1,155 @@
+"""Modèle numérique des cotations.
+
+Les fonctions de marché renvoient des ``Quote`` (une cotation) ou des ``QuoteBatch``
+(un lot stocké par colonnes) qui conservent les valeurs brutes : prix et variations
+en float, horodatages en secondes epoch. La mise en forme (« +1.23% », « N/A »...)
+n'est faite qu'à l'affichage, par ``format_price`` / ``format_change`` / ``to_frame``.
+"""
+import math
+import time
+from array import array
+
+NAN = float("nan")
+
+COLUMNS = ("kind", "symbol", "name", "unit", "last", "change_pct", "timestamp")
+NUMERIC_COLUMNS = ("last", "change_pct", "timestamp")
+
+#########################
+# 1. MISE EN FORME (affichage uniquement)
+#########################
+def format_price(value):
+    return "N/A" if value is None or math.isnan(value) else f"{value:.2f}"
+
+def format_change(value):
+    return "N/A" if value is None or math.isnan(value) else f"{value:+.2f}%"
+
+def _to_float(value):
+    if value is None:
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+#########################
+# 2. COTATION UNITAIRE
+#########################
+class Quote:
+    """Cotation d'un instrument ; NaN signale une valeur manquante."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, kind, symbol, name, last, change_pct=None, unit="", timestamp=None):
+        self.kind = kind
+        self.symbol = symbol
+        self.name = name
+        self.unit = unit or ""
+        self.last = _to_float(last)
+        self.change_pct = _to_float(change_pct)
+        self.timestamp = time.time() if timestamp is None else float(timestamp)
+
+    @property
+    def has_price(self):
+        return not math.isnan(self.last)
+
+    def __repr__(self):
+        return (
+            f"Quote({self.kind!r}, {self.symbol!r}, {self.name!r}, "
+            f"last={self.last}, change_pct={self.change_pct})"
+        )
+
+#########################
+# 3. LOT DE COTATIONS (stockage par colonnes)
+#########################
+class QuoteBatch:
+    """Lot de cotations : une liste par colonne texte, un array('d') par colonne numérique."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, quotes=()):
+        self.kind = []
+        self.symbol = []
+        self.name = []
+        self.unit = []
+        self.last = array("d")
+        self.change_pct = array("d")
+        self.timestamp = array("d")
+        for quote in quotes:
+            self.append(quote)
+
+    def append(self, quote):
+        for column in COLUMNS:
+            getattr(self, column).append(getattr(quote, column))
+
+    def extend(self, other):
+        for column in COLUMNS:
+            getattr(self, column).extend(getattr(other, column))
+
+    def __len__(self):
+        return len(self.symbol)
+
+    def __getitem__(self, i):
+        return Quote(
+            self.kind[i], self.symbol[i], self.name[i], self.last[i],
+            self.change_pct[i], self.unit[i], self.timestamp[i],
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, symbol=None, name=None):
+        for i in range(len(self)):
+            if (symbol is None or self.symbol[i] == symbol) and (name is None or self.name[i] == name):
+                return self[i]
+        return None
+
+    def column(self, name):
+        """Copie numpy d'une colonne numérique."""
+        return self._view(name).copy()
+
+    def _view(self, name):
+        # Vue sans copie : tant qu'elle existe, l'array ne peut plus grandir
+        # (BufferError sur append / extend). À ne pas conserver.
+        import numpy as np
+
+        if name not in NUMERIC_COLUMNS:
+            raise ValueError(f"Colonne non numérique : {name}")
+        return np.frombuffer(getattr(self, name), dtype=np.float64)
+
+    def take(self, indices):
+        batch = QuoteBatch()
+        for column in COLUMNS:
+            values = getattr(self, column)
+            target = getattr(batch, column)
+            target.extend(values[i] for i in indices)
+        return batch
+
+    def sort_by(self, column="change_pct", descending=False):
+        """Trie le lot ; les valeurs manquantes (NaN) sont placées à la fin."""
+        import numpy as np
+
+        values = self._view(column)
+        order = np.argsort(-values if descending else values, kind="stable")
+        return self.take(order.tolist())
+
+    def where(self, column, low=-math.inf, high=math.inf):
+        """Cotations dont la colonne est comprise entre low et high (bornes incluses)."""
+        import numpy as np
+
+        values = self._view(column)
+        return self.take(np.flatnonzero((values >= low) & (values <= high)).tolist())
+
+    def to_frame(self, change_label="Variation", unit_label="Unité"):
+        """DataFrame mis en forme pour st.table / st.dataframe."""
+        import pandas as pd
+
+        frame = {
+            "Nom": self.name,
+            "Ticker": self.symbol,
+            "Dernier": [format_price(v) for v in self.last],
+        }
+        if any(self.unit):
+            frame[unit_label] = self.unit
+        frame[change_label] = [format_change(v) for v in self.change_pct]
+        return pd.DataFrame(frame)
@@ -1,5 +1,13 @@
+import os
+import shutil
+import sys
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
 import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # 1. Liste des tableaux disponibles
 def get_all_cubes():
@@ -19,8 +27,136 @@ def get_vector_data(vector_id):
     response = requests.get(url)
     return response.json()["object"]
 
+# 4. Télécharger un tableau complet (zip CSV) en flux, sans le charger en mémoire
+def download_full_table(product_id, dest_dir="."):
+    url = f"https://www150.statcan.gc.ca/t1/wds/rest/getFullTableDownloadCSV/{product_id}/en"
+    response = requests.get(url)
+    zip_url = response.json()["object"]
+    path = os.path.join(dest_dir, f"{product_id}-eng.zip")
+    with requests.get(zip_url, stream=True) as r:
+        r.raise_for_status()
+        with open(path, "wb") as f:
+            for block in r.iter_content(chunk_size=1 << 20):
+                f.write(block)
+    return path
+
+# 5. Lire un tableau par morceaux de taille bornée, filtrés par GEO / REF_DATE
+def iter_table_chunks(path, chunksize=200_000, geo=None, ref_date_min=None, ref_date_max=None):
+    """Itère sur les lignes d'un tableau (zip StatCan ou CSV) par DataFrames de chunksize lignes.
+
+    geo : liste de régions à conserver ; ref_date_min / ref_date_max : bornes incluses,
+    comparées au début de REF_DATE de même longueur (« 2019 » inclut « 2019-12 »).
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            name = next(n for n in zf.namelist() if n.endswith(".csv") and "MetaData" not in n)
+            with zf.open(name) as f:
+                yield from _filtered_chunks(f, chunksize, geo, ref_date_min, ref_date_max)
+    else:
+        with open(path, "rb") as f:
+            yield from _filtered_chunks(f, chunksize, geo, ref_date_min, ref_date_max)
+
+def _filtered_chunks(f, chunksize, geo, ref_date_min, ref_date_max):
+    geo = set(geo) if geo else None
+    reader = pd.read_csv(f, chunksize=chunksize, dtype=str, encoding="utf-8-sig")
+    for chunk in reader:
+        mask = pd.Series(True, index=chunk.index)
+        if geo is not None:
+            mask &= chunk["GEO"].isin(geo)
+        if ref_date_min is not None:
+            mask &= chunk["REF_DATE"].str[:len(ref_date_min)] >= ref_date_min
+        if ref_date_max is not None:
+            mask &= chunk["REF_DATE"].str[:len(ref_date_max)] <= ref_date_max
+        if mask.any():
+            yield chunk[mask]
+
+# 6. Types compacts : catégories pour le texte répétitif, float32 / entiers réduits pour les nombres
+NUMERIC_COLUMNS = {"VALUE": "float32", "DECIMALS": "Int8", "SCALAR_ID": "Int8", "UOM_ID": "Int16"}
+ARROW_TYPES = {"float32": pa.float32(), "Int8": pa.int8(), "Int16": pa.int16()}
+
+# Presque une valeur distincte par série : une catégorie y coûterait plus que le texte.
+# Les autres colonnes texte (GEO, UOM, SCALAR_FACTOR, STATUS, SYMBOL, dimensions...)
+# ne prennent que quelques valeurs et deviennent des catégories.
+HIGH_CARDINALITY_COLUMNS = {"VECTOR", "COORDINATE"}
+
+def compact_dtypes(df):
+    df = df.copy()
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(NUMERIC_COLUMNS[col])
+        elif col not in HIGH_CARDINALITY_COLUMNS:
+            df[col] = df[col].astype("category")
+    return df
+
+def parquet_schema(columns):
+    """Schéma Arrow commun à toutes les parties d'un tableau.
+
+    Sans lui, chaque partie prendrait le plus petit index de catégorie possible
+    (int8, int16...) et le dossier ne se relirait plus d'un bloc.
+    """
+    fields = []
+    for col in columns:
+        if col in NUMERIC_COLUMNS:
+            fields.append(pa.field(col, ARROW_TYPES[NUMERIC_COLUMNS[col]]))
+        elif col in HIGH_CARDINALITY_COLUMNS:
+            fields.append(pa.field(col, pa.string()))
+        else:
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+    return pa.schema(fields)
+
+def _write_chunk(chunk, out_dir, index):
+    """Écrit un morceau en Parquet, un fichier par année de REF_DATE."""
+    chunk = compact_dtypes(chunk)
+    schema = parquet_schema(chunk.columns)
+    years = chunk["REF_DATE"].astype(str).str[:4]
+    written = 0
+    for year, part in chunk.groupby(years, observed=True):
+        # groupby conserve toutes les catégories du morceau, même absentes de l'année
+        part = part.apply(lambda s: s.cat.remove_unused_categories() if isinstance(s.dtype, pd.CategoricalDtype) else s)
+        part_dir = os.path.join(out_dir, f"year={year}")
+        os.makedirs(part_dir, exist_ok=True)
+        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, f"part-{index:05d}.parquet"))
+        written += len(part)
+    return written
+
+# 7. Convertir un tableau complet en Parquet partitionné, en mémoire bornée
+def table_to_parquet(path, out_dir, chunksize=200_000, workers=None, overwrite=False, **filters):
+    """Convertit un tableau StatCan en Parquet partitionné par année (out_dir/year=AAAA/).
+
+    La lecture est séquentielle ; conversion et écriture sont réparties sur plusieurs
+    processus. Au plus « workers » morceaux sont en cours à la fois, si bien que la
+    mémoire reste bornée quelle que soit la taille du tableau.
+
+    Un out_dir non vide est refusé (des fichiers d'une conversion précédente
+    dupliqueraient des lignes), sauf avec overwrite=True qui le vide d'abord.
+    """
+    workers = workers or os.cpu_count() or 1
+    if os.path.isdir(out_dir) and os.listdir(out_dir):
+        if not overwrite:
+            raise FileExistsError(f"Dossier de sortie non vide : {out_dir}")
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    total = 0
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, chunk in enumerate(iter_table_chunks(path, chunksize, **filters)):
+            if len(pending) >= workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                total += sum(f.result() for f in done)
+            pending.add(pool.submit(_write_chunk, chunk, out_dir, index))
+        total += sum(f.result() for f in wait(pending).done)
+    return total
+
 # Exemple d'utilisation
 if __name__ == "__main__":
+    # python statcan_fetch.py <productId> <dossier de sortie> : tableau complet -> Parquet
+    if len(sys.argv) == 3:
+        zip_path = download_full_table(sys.argv[1])
+        rows = table_to_parquet(zip_path, sys.argv[2])
+        print(f"{rows} lignes écrites dans {sys.argv[2]}")
+        sys.exit()
+
     cubes = get_all_cubes()
     print(f"Nombre total de tableaux disponibles : {len(cubes)}")
 
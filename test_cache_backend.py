@@ -0,0 +1,210 @@
+import threading
+import time
+
+import pytest
+
+import cache_backend
+from cache_backend import (
+    MemoryBackend, RedisBackend, SQLiteBackend, _cache_key, list_members, load_state, memoize, register_member, save_state,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeRedis:
+    """Substitut local d'un client redis-py (get / set(ex=, nx=) / incr / expire / delete)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def _now(self):
+        return cache_backend.time.time()
+
+    def _alive(self, key):
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= self._now():
+            del self.data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._alive(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = (value, self._now() + ex if ex else None)
+        return True
+
+    def incr(self, key):
+        entry = self._alive(key)
+        count = int(entry[0]) + 1 if entry else 1
+        self.data[key] = (str(count).encode(), entry[1] if entry else None)
+        return count
+
+    def expire(self, key, seconds):
+        value, _ = self.data[key]
+        self.data[key] = (value, self._now() + seconds)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_backend, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "noos.db"))
+    return RedisBackend(FakeRedis())
+
+
+def test_backend_ttl_add_incr(backend, clock):
+    backend.set("k", b"v", ttl=10)
+    assert backend.get("k") == b"v"
+    assert not backend.add("k", b"x", ttl=10)
+    assert backend.incr("c", ttl=5) == 1
+    assert backend.incr("c", ttl=5) == 2
+    clock.sleep(11)
+    assert backend.get("k") is None
+    assert backend.add("k", b"x", ttl=10)
+    assert backend.incr("c", ttl=5) == 1
+    backend.delete("k")
+    assert backend.get("k") is None
+
+
+def test_user_state_roundtrip(backend):
+    assert load_state(backend, "u1", "portfolio", {}) == {}
+    save_state(backend, "u1", "portfolio", {"bond:US10Y": 4.25})
+    assert load_state(backend, "u1", "portfolio", {}) == {"bond:US10Y": 4.25}
+    assert load_state(backend, "u2", "portfolio", {}) == {}
+
+
+def test_registry_has_one_key_per_member(backend):
+    assert list_members(backend, "price_alerts") == []
+    assert register_member(backend, "price_alerts", "u1")
+    assert not register_member(backend, "price_alerts", "u1")
+    assert register_member(backend, "price_alerts", "u2")
+    assert list_members(backend, "price_alerts") == ["u1", "u2"]
+    # Rang réservé par un autre réplica mais pas encore écrit
+    backend.incr("registry:price_alerts:count")
+    assert list_members(backend, "price_alerts") == ["u1", "u2"]
+
+
+def test_sqlite_purge_removes_expired_rows(tmp_path, clock):
+    backend = SQLiteBackend(str(tmp_path / "noos.db"))
+    backend.set("old", b"1", ttl=1)
+    backend.incr("budget:1", ttl=1)
+    backend.set("forever", b"1")
+    clock.sleep(2)
+    assert backend.purge() == 2
+    rows = backend._connect().execute("SELECT key FROM kv").fetchall()
+    assert rows == [("forever",)]
+
+
+def test_sqlite_set_purges_periodically(tmp_path, clock):
+    backend = SQLiteBackend(str(tmp_path / "noos.db"))
+    backend.purge_every = 1
+    backend.set("old", b"1", ttl=1)
+    clock.sleep(2)
+    backend.set("new", b"1", ttl=1)
+    rows = backend._connect().execute("SELECT key FROM kv").fetchall()
+    assert rows == [("new",)]
+
+
+def test_memoize_serves_fresh_value_without_upstream_call(backend, clock):
+    calls = []
+
+    @memoize(backend, ttl=60)
+    def fetch(x):
+        calls.append(x)
+        return x * 2
+
+    assert fetch(2) == 4
+    assert fetch(2) == 4
+    assert fetch(3) == 6
+    assert calls == [2, 3]
+    clock.sleep(61)
+    assert fetch(2) == 4
+    assert calls == [2, 3, 2]
+
+
+def test_memoize_single_upstream_call_across_callers(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "noos.db"))
+    calls = []
+    started = threading.Event()
+
+    @memoize(backend, ttl=60)
+    def fetch(x):
+        calls.append(x)
+        started.set()
+        time.sleep(0.3)
+        return x * 2
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(fetch(5)))
+    first.start()
+    started.wait()
+    # Un autre appelant (autre réplica) pendant que le premier tient le verrou
+    results.append(fetch(5))
+    first.join()
+    assert results == [10, 10]
+    assert calls == [5]
+
+
+def test_memoize_serves_stale_value_while_lock_is_held(backend, clock):
+    calls = []
+
+    @memoize(backend, ttl=60)
+    def fetch(x):
+        calls.append(x)
+        return len(calls)
+
+    assert fetch(1) == 1
+    clock.sleep(61)
+    assert backend.add(_cache_key(fetch.__wrapped__, (1,), {}) + ":lock", b"1", ttl=30)
+    assert fetch(1) == 1
+    assert calls == [1]
+
+
+def test_memoize_budget_falls_back_to_stale_value(backend, clock):
+    calls = []
+
+    @memoize(backend, ttl=10, upstream_budget=1)
+    def fetch(x):
+        calls.append(x)
+        return len(calls)
+
+    assert fetch(1) == 1
+    clock.sleep(11)
+    assert fetch(1) == 1
+    assert calls == [1]
+
+
+def test_memoize_cold_keys_go_upstream_even_over_budget(backend, clock):
+    calls = []
+
+    @memoize(backend, ttl=10, upstream_budget=2)
+    def fetch(x):
+        calls.append(x)
+        return x
+
+    assert [fetch(1), fetch(2), fetch(3)] == [1, 2, 3]
+    assert calls == [1, 2, 3]
@@ -0,0 +1,145 @@
+import pickle
+
+import pytest
+
+import price_alerts
+from price_alerts import AlertBook, FiringState, PriceAlert, ThresholdIndex, send_email_alerts
+from quotes import Quote, QuoteBatch
+
+
+def btc(last, change_pct=0.0):
+    return QuoteBatch([Quote("crypto", "bitcoin", "Bitcoin", last, change_pct)])
+
+
+def describe(fired):
+    return [alert.describe() for alert, _ in fired]
+
+
+def test_threshold_index_boundaries_are_inclusive():
+    index = ThresholdIndex()
+    index.add(PriceAlert(1, "crypto", "bitcoin", "Bitcoin", "last", "above", 100))
+    index.add(PriceAlert(2, "crypto", "bitcoin", "Bitcoin", "last", "above", 200))
+    index.add(PriceAlert(3, "crypto", "bitcoin", "Bitcoin", "last", "below", 50))
+    index.add(PriceAlert(4, "crypto", "bitcoin", "Bitcoin", "last", "below", 80))
+    assert index.matches("crypto", "bitcoin", "last", 100) == [1]
+    assert index.matches("crypto", "bitcoin", "last", 99.99) == []
+    assert index.matches("crypto", "bitcoin", "last", 250) == [1, 2]
+    assert index.matches("crypto", "bitcoin", "last", 80) == [4]
+    assert index.matches("crypto", "bitcoin", "last", 50) == [3, 4]
+    assert index.matches("crypto", "bitcoin", "last", float("nan")) == []
+    assert index.matches("crypto", "ethereum", "last", 1000) == []
+
+
+def test_evaluate_ignores_other_instruments_and_nan():
+    index = ThresholdIndex()
+    index.add(PriceAlert(1, "crypto", "bitcoin", "Bitcoin", "change_pct", "above", 5))
+    batch = QuoteBatch([
+        Quote("crypto", "ethereum", "Ethereum", 3000, 10),
+        Quote("bond", "bitcoin", "Homonyme", 3000, 10),
+        Quote("crypto", "bitcoin", "Bitcoin", 60000, None),
+    ])
+    assert index.evaluate(batch) == {}
+    assert index.evaluate(btc(60000, 5.0)) == {1: 5.0}
+
+
+def test_alert_fires_on_crossing_and_rearms():
+    book, state = AlertBook(), FiringState()
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 100, cooldown=0)
+    assert describe(book.check(btc(120), state, now=0)) == ["Bitcoin : Prix au-dessus de 100"]
+    # Condition toujours vraie : pas de doublon
+    assert book.check(btc(130), state, now=1) == []
+    # Repasse sous le seuil : réarmée, puis redéclenchée
+    assert book.check(btc(90), state, now=2) == []
+    assert len(book.check(btc(110), state, now=3)) == 1
+
+
+def test_missing_quote_does_not_rearm():
+    book, state = AlertBook(), FiringState()
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 100, cooldown=0)
+    book.add("bond", "US10Y", "US 10Y", "last", "above", 4, cooldown=0)
+    us10y = QuoteBatch([Quote("bond", "US10Y", "US 10Y", 4.5)])
+    assert len(book.check(btc(120), state, now=0)) == 1
+    # Bitcoin absent puis sans prix pendant un tick : ni réarmée ni redéclenchée
+    assert describe(book.check(us10y, state, now=1)) == ["US 10Y : Prix au-dessus de 4"]
+    assert book.check(btc(None), state, now=2) == []
+    assert book.check(btc(130), state, now=3) == []
+    assert book.check(us10y, state, now=4) == []
+
+
+def test_cooldown_suppresses_refiring():
+    book, state = AlertBook(), FiringState()
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "below", 50, cooldown=60)
+    assert len(book.check(btc(40), state, now=0)) == 1
+    assert book.check(btc(60), state, now=10) == []
+    assert book.check(btc(40), state, now=20) == []
+    assert book.check(btc(60), state, now=30) == []
+    assert len(book.check(btc(40), state, now=61)) == 1
+
+
+def test_remove_and_remove_instrument():
+    book, state = AlertBook(), FiringState()
+    first = book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 100)
+    book.add("crypto", "bitcoin", "Bitcoin", "change_pct", "below", -5)
+    book.add("bond", "US10Y", "US 10Y", "last", "above", 4)
+    book.remove(first.alert_id)
+    assert book.check(btc(120), state, now=0) == []
+    book.remove_instrument("crypto", "bitcoin")
+    assert [a.symbol for a in book.alerts.values()] == ["US10Y"]
+    assert book.check(btc(120, -10), state, now=1) == []
+    assert book.index.evaluate(btc(120, -10)) == {}
+
+
+def test_book_survives_pickling():
+    book, state = AlertBook(), FiringState()
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 100)
+    book.check(btc(120), state, now=0)
+    restored, state = pickle.loads(pickle.dumps((book, state)))
+    assert restored.check(btc(130), state, now=1) == []
+    assert restored.add("crypto", "bitcoin", "Bitcoin", "last", "above", 1).alert_id == 2
+
+
+def test_invalid_alert_is_rejected():
+    with pytest.raises(ValueError):
+        PriceAlert(1, "crypto", "bitcoin", "Bitcoin", "volume", "above", 1)
+
+
+class StubSMTP:
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        self.address = (host, port)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send_message(self, msg):
+        StubSMTP.sent.append((self.address, msg))
+
+
+def test_send_email_alerts_groups_by_recipient(monkeypatch):
+    monkeypatch.setattr(price_alerts.smtplib, "SMTP", StubSMTP)
+    StubSMTP.sent = []
+    book, state = AlertBook(), FiringState()
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 100, mode="Email", email="a@example.org")
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 110, mode="Email", email="a@example.org")
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 90, mode="Email", email="b@example.org")
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 80)
+    fired = book.check(btc(120), state, now=0)
+    assert len(fired) == 4
+    assert send_email_alerts(fired, host="smtp.test", port=2525) == 2
+    recipients = {msg["To"]: msg for _, msg in StubSMTP.sent}
+    assert set(recipients) == {"a@example.org", "b@example.org"}
+    assert recipients["a@example.org"]["Subject"] == "Noos : 2 alerte(s) de prix"
+    assert StubSMTP.sent[0][0] == ("smtp.test", 2525)
+
+
+def test_send_email_alerts_skips_dashboard_only(monkeypatch):
+    monkeypatch.setattr(price_alerts.smtplib, "SMTP", StubSMTP)
+    StubSMTP.sent = []
+    book, state = AlertBook(), FiringState()
+    book.add("crypto", "bitcoin", "Bitcoin", "last", "above", 100)
+    assert send_email_alerts(book.check(btc(120), state, now=0)) == 0
+    assert StubSMTP.sent == []
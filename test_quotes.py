@@ -0,0 +1,75 @@
+import math
+import pickle
+
+from quotes import Quote, QuoteBatch, format_change, format_price
+
+
+def make_batch():
+    return QuoteBatch([
+        Quote("bond", "US10Y", "US 10Y", 4.25, -0.03, unit="%", timestamp=1.0),
+        Quote("crypto", "bitcoin", "Bitcoin", None, 2.5, unit="USD", timestamp=2.0),
+        Quote("commodity", "GCUSD", "Or", 2345.2, None, unit="USD/oz", timestamp=3.0),
+        Quote("bourse", "^DJI", "Dow Jones", 39000.0, 0.8, timestamp=4.0),
+    ])
+
+
+def test_missing_values_become_nan():
+    quote = Quote("crypto", "bitcoin", "Bitcoin", None, "n/a")
+    assert math.isnan(quote.last) and math.isnan(quote.change_pct)
+    assert not quote.has_price
+    assert Quote("bond", "US10Y", "US 10Y", "4.25").last == 4.25
+
+
+def test_formatting_only_at_display():
+    assert format_price(4.25) == "4.25"
+    assert format_change(-0.03) == "-0.03%"
+    assert format_change(0.0) == "+0.00%"
+    assert format_price(float("nan")) == "N/A"
+    assert format_change(None) == "N/A"
+
+
+def test_batch_is_columnar_and_iterable():
+    batch = make_batch()
+    assert len(batch) == 4
+    assert batch.name == ["US 10Y", "Bitcoin", "Or", "Dow Jones"]
+    assert batch.last.typecode == "d"
+    assert [q.symbol for q in batch] == batch.symbol
+    assert batch.find(name="Or").unit == "USD/oz"
+    assert batch.find(symbol="absent") is None
+
+
+def test_sort_by_puts_nan_last():
+    batch = make_batch()
+    assert batch.sort_by("last").symbol == ["US10Y", "GCUSD", "^DJI", "bitcoin"]
+    assert batch.sort_by("last", descending=True).symbol == ["^DJI", "GCUSD", "US10Y", "bitcoin"]
+    assert batch.sort_by("change_pct", descending=True).symbol == ["bitcoin", "^DJI", "US10Y", "GCUSD"]
+
+
+def test_where_filters_inclusive_bounds_and_skips_nan():
+    batch = make_batch()
+    assert batch.where("change_pct", low=-0.03, high=0.8).symbol == ["US10Y", "^DJI"]
+    assert batch.where("last", low=100).symbol == ["GCUSD", "^DJI"]
+
+
+def test_column_is_a_copy():
+    batch = make_batch()
+    last = batch.column("last")
+    last[0] = 0.0
+    batch.append(Quote("bond", "DE10Y", "Bund 10Y", 2.37, 0.01))
+    assert batch.last[0] == 4.25
+    assert len(batch) == 5
+
+
+def test_pickle_roundtrip():
+    batch = pickle.loads(pickle.dumps(make_batch()))
+    assert batch.symbol == make_batch().symbol
+    assert list(batch.timestamp) == [1.0, 2.0, 3.0, 4.0]
+    quote = pickle.loads(pickle.dumps(batch[0]))
+    assert (quote.kind, quote.last, quote.unit) == ("bond", 4.25, "%")
+
+
+def test_to_frame_formats_values():
+    frame = make_batch().to_frame(change_label="Variation 24h")
+    assert list(frame.columns) == ["Nom", "Ticker", "Dernier", "Unité", "Variation 24h"]
+    assert list(frame["Dernier"]) == ["4.25", "N/A", "2345.20", "39000.00"]
+    assert list(frame["Variation 24h"]) == ["-0.03%", "+2.50%", "N/A", "+0.80%"]
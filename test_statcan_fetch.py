@@ -0,0 +1,102 @@
+import zipfile
+
+import pandas as pd
+import pytest
+
+from statcan_fetch import compact_dtypes, iter_table_chunks, table_to_parquet
+
+HEADER = "REF_DATE,GEO,DGUID,UOM,UOM_ID,SCALAR_FACTOR,SCALAR_ID,VECTOR,COORDINATE,VALUE,STATUS,SYMBOL,TERMINATED,DECIMALS"
+GEOS = ["Canada", "Québec", "Ontario"]
+
+
+@pytest.fixture
+def table_zip(tmp_path):
+    """Tableau mensuel 2018-2021, 3 régions x 5 séries : 720 lignes."""
+    rows = [HEADER]
+    for year in range(2018, 2022):
+        for month in range(1, 13):
+            for g, geo in enumerate(GEOS):
+                for v in range(5):
+                    value = "" if v == 4 else f"{year + month / 100 + v:.2f}"
+                    rows.append(f"{year}-{month:02d},{geo},x{g},Dollars,81,units,0,v{g * 5 + v},{g + 1}.{v + 1},{value},,,,2")
+    path = tmp_path / "12345-eng.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("12345.csv", "﻿" + "\n".join(rows) + "\n")
+        zf.writestr("12345_MetaData.csv", "Cube Title\n")
+    return path
+
+
+def test_chunks_are_bounded_and_filtered(table_zip):
+    chunks = list(iter_table_chunks(table_zip, chunksize=100, geo=["Canada", "Québec"]))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    rows = pd.concat(chunks)
+    assert len(rows) == 480
+    assert set(rows["GEO"]) == {"Canada", "Québec"}
+
+
+def test_ref_date_bounds_compare_on_prefix(table_zip):
+    rows = pd.concat(iter_table_chunks(table_zip, ref_date_min="2019", ref_date_max="2019"))
+    assert len(rows) == 180
+    assert rows["REF_DATE"].min() == "2019-01" and rows["REF_DATE"].max() == "2019-12"
+    rows = pd.concat(iter_table_chunks(table_zip, ref_date_min="2020-11", ref_date_max="2021-02"))
+    assert sorted(rows["REF_DATE"].unique()) == ["2020-11", "2020-12", "2021-01", "2021-02"]
+
+
+def test_plain_csv_is_read_too(tmp_path, table_zip):
+    csv_path = tmp_path / "12345.csv"
+    with zipfile.ZipFile(table_zip) as zf:
+        csv_path.write_bytes(zf.read("12345.csv"))
+    assert sum(len(c) for c in iter_table_chunks(csv_path, chunksize=250)) == 720
+
+
+def test_compact_dtypes(table_zip):
+    chunk = next(iter_table_chunks(table_zip, chunksize=200))
+    df = compact_dtypes(chunk)
+    assert df["VALUE"].dtype == "float32"
+    assert df["VALUE"].isna().sum() == 40
+    assert str(df["DECIMALS"].dtype) == "Int8"
+    assert str(df["UOM_ID"].dtype) == "Int16"
+    for col in ("REF_DATE", "GEO", "UOM", "SCALAR_FACTOR", "STATUS"):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    for col in ("VECTOR", "COORDINATE"):
+        assert not isinstance(df[col].dtype, pd.CategoricalDtype), col
+
+
+def test_table_to_parquet_partitions_by_year(tmp_path, table_zip):
+    out = tmp_path / "parquet"
+    written = table_to_parquet(table_zip, out, chunksize=100, workers=2, geo=["Canada"], ref_date_max="2019")
+    assert written == 120
+    assert sorted(p.name for p in out.iterdir()) == ["year=2018", "year=2019"]
+    df = pd.read_parquet(out)
+    assert len(df) == 120
+    assert set(df["GEO"]) == {"Canada"}
+    assert df["VALUE"].dtype == "float32"
+    assert sorted(df["year"].astype(str).unique()) == ["2018", "2019"]
+
+
+def test_table_to_parquet_refuses_non_empty_output(tmp_path, table_zip):
+    out = tmp_path / "parquet"
+    table_to_parquet(table_zip, out, chunksize=100, workers=2)
+    with pytest.raises(FileExistsError):
+        table_to_parquet(table_zip, out, chunksize=300, workers=2)
+    assert table_to_parquet(table_zip, out, chunksize=300, workers=2, overwrite=True) == 720
+    assert len(pd.read_parquet(out)) == 720
+
+
+def test_parts_with_different_cardinality_read_back_together(tmp_path):
+    # Morceau 1 : une seule région ; morceau 2 : 50 lignes 2018 + 150 régions en 2019
+    # (index de catégorie int8 d'un côté, int16 de l'autre sans schéma commun).
+    rows = [HEADER]
+    rows += [f"2018-{m % 12 + 1:02d},Canada,x,Dollars,81,units,0,v{m},1.{m},1.5,,,,2" for m in range(250)]
+    rows += [f"2019-01,Région {g},x,Dollars,81,units,0,v{g},1.{g},{g}.5,A,,,2" for g in range(150)]
+    path = tmp_path / "large.csv"
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    out = tmp_path / "parquet"
+    assert table_to_parquet(path, out, chunksize=200, workers=2) == 400
+    df = pd.read_parquet(out)
+    assert len(df) == 400
+    assert df["GEO"].nunique() == 151
+    assert set(df["STATUS"].dropna()) == {"A"}
+    # Pas de catégories inutilisées dans la partie 2018 du second morceau
+    part = pd.read_parquet(out / "year=2018" / "part-00001.parquet")
+    assert list(part["GEO"].cat.categories) == ["Canada"]